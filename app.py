@@ -2,10 +2,17 @@
 import os
 import sys
 import glob
+import threading
+from collections import OrderedDict
 from datetime import date
+import numpy as np
 import pandas as pd
-from dash import Dash, dcc, html, Input, Output
+import pyarrow.dataset as ds
+from dash import Dash, dcc, html, Input, Output, State, no_update
 import plotly.graph_objects as go
+import plotly_resampler
+from plotly_resampler import FigureResampler
+from dash_extensions.enrich import FileSystemBackend
 
 # -------------------------------------------------
 # Paths
@@ -15,70 +22,68 @@ SRC_DIR = os.path.join(ROOT, "src")
 DATA_DIR = os.path.join(ROOT, "data")
 PROCESSED_DIR = os.path.join(DATA_DIR, "processed")
 FORECAST_DIR = os.path.join(DATA_DIR, "forecasted")
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
 
 sys.path.append(SRC_DIR)
 
 # -------------------------------------------------
-# Import pipeline steps
+# Import pipeline
 # -------------------------------------------------
-from collect_data import main as collect_main
-from processed_data import main as process_main
-from forecast_data import main as forecast_main
+from pipeline import main as pipeline_main, pipeline_lock
 
 # -------------------------------------------------
 # Data freshness check
 # -------------------------------------------------
-def data_is_fresh():
-    if not os.path.exists(PROCESSED_DIR):
-        return False
+LAST_RUN_PATH = os.path.join(PROCESSED_DIR, ".last_run")
 
-    files = glob.glob(os.path.join(PROCESSED_DIR, "*.csv"))
-    if not files:
+def data_is_fresh():
+    # Sentinel written atomically by the pipeline at the end of each run
+    try:
+        with open(LAST_RUN_PATH) as f:
+            return f.read().strip() == str(date.today())
+    except OSError:
         return False
 
-    latest = max(files, key=os.path.getmtime)
-    latest_date = date.fromtimestamp(os.path.getmtime(latest))
-    return latest_date == date.today()
-
 # -------------------------------------------------
-# Run pipeline if needed
+# Load Parquet helpers
 # -------------------------------------------------
-if not data_is_fresh():
-    print("🔄 Running daily data pipeline...")
-    collect_main()
-    process_main()
-    forecast_main()
-else:
-    print("✅ Using cached daily data")
+PROCESSED_COLUMNS = [
+    "date", "symbol", "price",
+    "Daily_Change_%", "Weekly_Change_7d_%", "Monthly_Change_30d_%",
+]
 
-# -------------------------------------------------
-# Load CSV helpers
-# -------------------------------------------------
-def load_csvs(path):
-    files = glob.glob(os.path.join(path, "*.csv"))
+def load_parquet(path, columns=None):
+    files = glob.glob(os.path.join(path, "*.parquet"))
     if not files:
         return pd.DataFrame()
-    df = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    table = ds.dataset(files, format="parquet").to_table(columns=columns)
+    df = table.to_pandas()
     # 
     df = df.dropna(subset=["date"]).sort_values("date")
     return df
 
-processed = load_csvs(PROCESSED_DIR)
-forecasted = load_csvs(FORECAST_DIR)
+def latest_mtime(*paths):
+    files = [f for p in paths for f in glob.glob(os.path.join(p, "*.parquet"))]
+    return int(max(map(os.path.getmtime, files))) if files else 0
+
+def split_by_symbol(df):
+    if df.empty or "symbol" not in df.columns:
+        return {}
+    return {s: g.reset_index(drop=True) for s, g in df.groupby("symbol", sort=False)}
 
 # -------------------------------------------------
 # Symbols & Labels
 # -------------------------------------------------
-symbols = []
+def collect_symbols(processed, forecasted):
+    symbols = []
 
-if not processed.empty and "symbol" in processed.columns:
-    symbols.extend(processed["symbol"].unique())
+    if not processed.empty and "symbol" in processed.columns:
+        symbols.extend(processed["symbol"].unique())
 
-if not forecasted.empty and "symbol" in forecasted.columns:
-    symbols.extend(forecasted["symbol"].unique())
+    if not forecasted.empty and "symbol" in forecasted.columns:
+        symbols.extend(forecasted["symbol"].unique())
 
-symbols = sorted(set(symbols))
+    return sorted(set(symbols))
 
 LABELS = {
      "BITCOIN": "bitcoin",
@@ -99,39 +104,43 @@ POS = "#2ecc71"          #
 NEG = "#e74c3c"          # 
 GRID = "#333"
 
-def base_layout(fig):
-    fig.update_layout(
-        template="plotly_dark",
-        margin=dict(l=20, r=20, t=50, b=30),
-        legend=dict(orientation="h", x=0.5, xanchor="center", y=-0.2),
-        xaxis=dict(showgrid=False),
-        yaxis=dict(showgrid=True, gridcolor=GRID),
-        font=dict(family="Segoe UI, Roboto, Helvetica, Arial, sans-serif"),
-        plot_bgcolor=BG,
-        paper_bgcolor=BG,
-    )
-    return fig
+# Max points per trace sent to the browser; resampled again on zoom/pan
+N_SHOWN_SAMPLES = 2000
+
+# Shared layout, built once and passed to every figure (no per-call update_layout merge)
+BASE_LAYOUT = go.Layout(
+    template="plotly_dark",
+    margin=dict(l=20, r=20, t=50, b=30),
+    legend=dict(orientation="h", x=0.5, xanchor="center", y=-0.2),
+    xaxis=dict(showgrid=False),
+    yaxis=dict(showgrid=True, gridcolor=GRID),
+    font=dict(family="Segoe UI, Roboto, Helvetica, Arial, sans-serif"),
+    plot_bgcolor=BG,
+    paper_bgcolor=BG,
+)
 
 # -------------------------------------------------
 # Figure builders
 # -------------------------------------------------
 def build_price_figure(df_real, df_fc, symbol):
-    fig = go.Figure()
+    fig = FigureResampler(go.Figure(layout=BASE_LAYOUT), default_n_shown_samples=N_SHOWN_SAMPLES)
 
-    # Actual
+    # Actual (high-frequency, downsampled per viewport)
     if not df_real.empty and "price" in df_real.columns:
-        fig.add_trace(go.Scatter(
-            x=df_real["date"],
-            y=df_real["price"],
-            mode="lines",
-            name="Actual",
-            line=dict(color=ACCENT, width=2.4),
-            hovertemplate="Date: %{x|%Y-%m-%d}<br>Price: %{y:.2f}<extra></extra>",
-        ))
+        fig.add_trace(
+            go.Scattergl(
+                mode="lines",
+                name="Actual",
+                line=dict(color=ACCENT, width=2.4),
+                hovertemplate="Date: %{x|%Y-%m-%d}<br>Price: %{y:.2f}<extra></extra>",
+            ),
+            hf_x=np.asarray(df_real["date"]),
+            hf_y=np.asarray(df_real["price"]),
+        )
 
     # Forecast
     if not df_fc.empty and "forecast" in df_fc.columns:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=df_fc["date"],
             y=df_fc["forecast"],
             mode="lines",
@@ -142,14 +151,14 @@ def build_price_figure(df_real, df_fc, symbol):
 
         # Confidence band
         if {"ci_lower", "ci_upper"}.issubset(df_fc.columns):
-            fig.add_trace(go.Scatter(
+            fig.add_trace(go.Scattergl(
                 x=df_fc["date"],
                 y=df_fc["ci_upper"],
                 line=dict(width=0),
                 showlegend=False,
                 hoverinfo="skip"
             ))
-            fig.add_trace(go.Scatter(
+            fig.add_trace(go.Scattergl(
                 x=df_fc["date"],
                 y=df_fc["ci_lower"],
                 fill="tonexty",
@@ -159,39 +168,161 @@ def build_price_figure(df_real, df_fc, symbol):
                 hoverinfo="skip"
             ))
 
-    title_symbol = LABELS.get(symbol, symbol)
-    fig.update_layout(title=f"{title_symbol} — Price & Forecast")
-    return base_layout(fig)
+    fig.update_layout(title=PRICE_TITLES.get(symbol) or f"{symbol} — Price & Forecast")
+    return fig
 
 def build_change_figure(df_real, symbol):
-    fig = go.Figure()
+    fig = go.Figure(layout=BASE_LAYOUT)
     cols = ["Daily_Change_%", "Weekly_Change_7d_%", "Monthly_Change_30d_%"]
 
     # 
     available = [c for c in cols if c in df_real.columns]
     if not available:
         fig.update_layout(title="Percentage changes (data not available)")
-        return base_layout(fig)
+        return fig
 
     # 
+    dates = df_real["date"].to_numpy()
     for col in available:
-        values = df_real[col]
-        colors = [POS if v >= 0 else NEG for v in values]
+        values = df_real[col].to_numpy()
+        colors = np.where(values >= 0, POS, NEG)
         fig.add_trace(go.Bar(
-            x=df_real["date"],
+            x=dates,
             y=values,
             name=col.replace("_", " "),
             marker=dict(color=colors),
             hovertemplate="Date: %{x|%Y-%m-%d}<br>% Change: %{y:.2f}%<extra></extra>",
         ))
 
-    title_symbol = LABELS.get(symbol, symbol)
     fig.update_layout(
         barmode="group",
-        title=f"{title_symbol} — Percentage changes",
-        yaxis=dict(title="%"),
+        title=CHANGE_TITLES.get(symbol) or f"{symbol} — Percentage changes",
+        yaxis_title="%",
     )
-    return base_layout(fig)
+    return fig
+
+# -------------------------------------------------
+# Figure cache (keyed on symbol, tab and data version)
+# -------------------------------------------------
+TABS = ("price", "changes")
+FIG_CACHE = FileSystemBackend(cache_dir=CACHE_DIR, default_timeout=0)
+
+# Bump when figure builders change so pickles from older code are not served
+FIG_CACHE_SCHEMA = 1
+FIG_CACHE_PREFIX = f"v{FIG_CACHE_SCHEMA}:{plotly_resampler.__version__}"
+
+# In-process LRU in front of FIG_CACHE: zoom/pan resampling and repeat
+# visits reuse the live object instead of unpickling it from disk each time
+FIG_MEMO_SIZE = 16
+FIG_MEMO = OrderedDict()
+FIG_MEMO_LOCK = threading.Lock()
+
+def read_cached_figure(key):
+    with FIG_MEMO_LOCK:
+        fig = FIG_MEMO.get(key)
+        if fig is not None:
+            FIG_MEMO.move_to_end(key)
+            return fig
+
+    try:
+        fig = FIG_CACHE.get(key)
+    except Exception as e:
+        # Unreadable / incompatible pickle -> treat as a miss and rebuild
+        print(f"⚠ Figure cache entry {key} unusable: {e}")
+        return None
+    if fig is not None:
+        remember_figure(key, fig)
+    return fig
+
+def remember_figure(key, fig):
+    with FIG_MEMO_LOCK:
+        FIG_MEMO[key] = fig
+        FIG_MEMO.move_to_end(key)
+        while len(FIG_MEMO) > FIG_MEMO_SIZE:
+            FIG_MEMO.popitem(last=False)
+
+def build_figure(symbol, tab):
+    df_real = PROCESSED_BY_SYM.get(symbol, pd.DataFrame())
+    df_fc = FORECASTED_BY_SYM.get(symbol, pd.DataFrame())
+
+    if tab == "price":
+        return build_price_figure(df_real, df_fc, symbol)
+    else:
+        return build_change_figure(df_real, symbol)
+
+def get_figure(symbol, tab):
+    key = f"{FIG_CACHE_PREFIX}:{symbol}:{tab}:{DATA_VERSION}"
+    fig = read_cached_figure(key)
+    if fig is None:
+        fig = build_figure(symbol, tab)
+        FIG_CACHE.set(key, fig)
+        remember_figure(key, fig)
+    return key, fig
+
+# -------------------------------------------------
+# Data loading (re-run after each background pipeline refresh)
+# -------------------------------------------------
+def load_data():
+    global processed, forecasted, PROCESSED_BY_SYM, FORECASTED_BY_SYM, symbols, DATA_VERSION
+    global PRICE_TITLES, CHANGE_TITLES
+
+    processed = load_parquet(PROCESSED_DIR, PROCESSED_COLUMNS)
+    forecasted = load_parquet(FORECAST_DIR)
+
+    # Per-symbol frames, built once so callbacks do a dict lookup instead of a scan
+    PROCESSED_BY_SYM = split_by_symbol(processed)
+    FORECASTED_BY_SYM = split_by_symbol(forecasted)
+    symbols = collect_symbols(processed, forecasted)
+    PRICE_TITLES = {s: f"{LABELS.get(s, s)} — Price & Forecast" for s in symbols}
+    CHANGE_TITLES = {s: f"{LABELS.get(s, s)} — Percentage changes" for s in symbols}
+
+    # Changes whenever the pipeline rewrites its outputs -> invalidates figure cache
+    DATA_VERSION = latest_mtime(PROCESSED_DIR, FORECAST_DIR)
+
+    # Pre-warm so the first interaction per symbol/tab is a cache hit
+    for s in symbols:
+        for t in TABS:
+            get_figure(s, t)
+
+def symbol_options():
+    return [{"label": LABELS.get(s, s), "value": s} for s in symbols]
+
+# Waits for a pipeline running in another process so no half-written file is read
+with pipeline_lock(blocking=True):
+    load_data()
+
+def reload_if_changed():
+    # Outputs may have been rewritten by another worker or the systemd timer
+    if latest_mtime(PROCESSED_DIR, FORECAST_DIR) == DATA_VERSION:
+        return
+    with pipeline_lock() as acquired:
+        # A pipeline still running elsewhere -> retry on the next poll
+        if acquired and latest_mtime(PROCESSED_DIR, FORECAST_DIR) != DATA_VERSION:
+            load_data()
+
+# -------------------------------------------------
+# Run pipeline if needed (in the background, serving cached data meanwhile)
+# -------------------------------------------------
+def run_pipeline():
+    # pipeline_main skips (returns False) if another process holds the lock
+    if not pipeline_main():
+        return
+    with pipeline_lock(blocking=True):
+        load_data()
+    print("✅ Daily data refreshed")
+
+DEBUG = True
+
+# With the debug reloader the module is imported by a watcher parent and a
+# serving child; only the serving process should run the pipeline
+reloader_parent = (
+    __name__ == "__main__" and DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+)
+
+if data_is_fresh():
+    print("✅ Using cached daily data")
+elif not reloader_parent:
+    threading.Thread(target=run_pipeline, daemon=True).start()
 
 # -------------------------------------------------
 # Dash app
@@ -199,63 +330,81 @@ def build_change_figure(df_real, symbol):
 app = Dash(__name__)
 app.title = "Macro Pulse"
 
-app.layout = html.Div(
-    style={"backgroundColor": BG, "minHeight": "100vh", "padding": "18px"},
-    children=[
-        html.Div(
-            style={
-                "backgroundColor": CARD_BG,
-                "padding": "18px",
-                "borderRadius": "12px",
-                "boxShadow": "0 6px 16px rgba(0,0,0,0.35)"
-            },
-            children=[
-                html.H2(
-                    "🌍 Macro Pulse Dashboard",
-                    style={"textAlign": "center", "color": ACCENT, "marginBottom": "16px"}
-                ),
-
-                html.Div(
-                    style={"display": "flex", "gap": "12px", "marginBottom": "12px"},
-                    children=[
-                        dcc.Dropdown(
-                            id="symbol",
-                            options=[{"label": LABELS.get(s, s), "value": s} for s in symbols],
-                            value=symbols[0] if symbols else None,
-                            clearable=False,
-                            style={"flex": "1"}
-                        ),
-                        dcc.Tabs(
-                            id="tabs",
-                            value="price",
-                            children=[
-                                dcc.Tab(label="📈 Price & Forecast", value="price"),
-                                dcc.Tab(label="📊 Percentage Changes", value="changes"),
-                            ],
-                            style={"flex": "2"}
-                        ),
-                    ]
-                ),
-
-                dcc.Loading(
-                    type="circle",
-                    color=ACCENT,
-                    children=dcc.Graph(id="chart", style={"height": "74vh"})
-                )
-            ]
-        )
-    ]
-)
+# Built per page load so new visitors get the current symbols and data version
+def serve_layout():
+    return html.Div(
+        style={"backgroundColor": BG, "minHeight": "100vh", "padding": "18px"},
+        children=[
+            html.Div(
+                style={
+                    "backgroundColor": CARD_BG,
+                    "padding": "18px",
+                    "borderRadius": "12px",
+                    "boxShadow": "0 6px 16px rgba(0,0,0,0.35)"
+                },
+                children=[
+                    html.H2(
+                        "🌍 Macro Pulse Dashboard",
+                        style={"textAlign": "center", "color": ACCENT, "marginBottom": "16px"}
+                    ),
+
+                    html.Div(
+                        style={"display": "flex", "gap": "12px", "marginBottom": "12px"},
+                        children=[
+                            dcc.Dropdown(
+                                id="symbol",
+                                options=symbol_options(),
+                                value=symbols[0] if symbols else None,
+                                clearable=False,
+                                style={"flex": "1"}
+                            ),
+                            dcc.Tabs(
+                                id="tabs",
+                                value="price",
+                                children=[
+                                    dcc.Tab(label="📈 Price & Forecast", value="price"),
+                                    dcc.Tab(label="📊 Percentage Changes", value="changes"),
+                                ],
+                                style={"flex": "2"}
+                            ),
+                        ]
+                    ),
+
+                    dcc.Loading(
+                        type="circle",
+                        color=ACCENT,
+                        children=[
+                            dcc.Graph(id="chart", style={"height": "74vh"}),
+
+                            # Both tab figures for the selected symbol; tabs switch
+                            # client-side. Inside Loading so the spinner shows while
+                            # the server builds them.
+                            dcc.Store(id="figs-cache"),
+                        ]
+                    ),
+
+                    # Cache key of the figure on screen (for zoom/pan resampling)
+                    dcc.Store(id="fig-key"),
+
+                    # Data version shown to this client; polled against the server's
+                    dcc.Store(id="data-version", data=DATA_VERSION),
+                    dcc.Interval(id="refresh", interval=60_000)
+                ]
+            )
+        ]
+    )
+
+app.layout = serve_layout
 
 # -------------------------------------------------
 # Callbacks
 # -------------------------------------------------
 @app.callback(
-    Output("chart", "figure"),
+    Output("figs-cache", "data"),
     Input("symbol", "value"),
-    Input("tabs", "value")
+    Input("data-version", "data")
 )
-def update_chart(symbol, tab):
+def update_figures(symbol, _version):
     # 
     if not symbol:
         fig = go.Figure()
@@ -266,18 +415,61 @@ def update_chart(symbol, tab):
             plot_bgcolor=BG,
             paper_bgcolor=BG
         )
-        return fig
+        return {"figures": {t: fig for t in TABS}, "keys": {}}
+
+    figures, keys = {}, {}
+    for tab in TABS:
+        keys[tab], figures[tab] = get_figure(symbol, tab)
+    return {"figures": figures, "keys": keys}
+
+app.clientside_callback(
+    """
+    function(tab, cache) {
+        if (!cache) {
+            return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+        }
+        return [cache.figures[tab], cache.keys[tab] || null];
+    }
+    """,
+    Output("chart", "figure"),
+    Output("fig-key", "data"),
+    Input("tabs", "value"),
+    Input("figs-cache", "data")
+)
 
-    df_real = processed[processed["symbol"] == symbol] if not processed.empty else pd.DataFrame()
-    df_fc = forecasted[forecasted["symbol"] == symbol] if not forecasted.empty else pd.DataFrame()
+@app.callback(
+    Output("chart", "figure", allow_duplicate=True),
+    Input("chart", "relayoutData"),
+    State("fig-key", "data"),
+    prevent_initial_call=True
+)
+def resample_chart(relayout, key):
+    fig = read_cached_figure(key) if key else None
+    if not isinstance(fig, FigureResampler) or not relayout:
+        return no_update
+    return fig.construct_update_data_patch(relayout)
 
-    if tab == "price":
-        return build_price_figure(df_real, df_fc, symbol)
-    else:
-        return build_change_figure(df_real, symbol)
+@app.callback(
+    Output("symbol", "options"),
+    Output("symbol", "value"),
+    Output("data-version", "data"),
+    Input("refresh", "n_intervals"),
+    State("data-version", "data"),
+    State("symbol", "value")
+)
+def refresh_data(_n, version, symbol):
+    reload_if_changed()
+
+    # Data reloaded since this client loaded -> swap in new data
+    if version == DATA_VERSION:
+        return no_update, no_update, no_update
+
+    if symbol not in symbols:
+        symbol = symbols[0] if symbols else None
+    return symbol_options(), symbol, DATA_VERSION
 
 # -------------------------------------------------
 # Entry point
 # -------------------------------------------------
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=DEBUG)
\ No newline at end of file
@@ -1,8 +1,11 @@
 
 import os
-import time
-import requests
+import asyncio
+import aiohttp
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from tenacity import retry, stop_after_attempt, wait_exponential
 
 RAW_PATH = os.path.join("data", "raw")
 os.makedirs(RAW_PATH, exist_ok=True)
@@ -15,46 +18,77 @@ CRYPTO_MAP = {
     "RIPPLE": "ripple",
 }
 
-def fetch_crypto(coin_id, symbol, days=30, retries=3):
+RETRIES = 3
+POOL_SIZE = 8
+# Upper bound (s) on any retry wait, so a long Retry-After can't stall the pipeline
+MAX_WAIT = 60
+
+class HTTPStatusError(RuntimeError):
+    def __init__(self, status, retry_after=0.0):
+        super().__init__(f"failed (status {status})")
+        self.retry_after = retry_after
+
+_backoff = wait_exponential(multiplier=2)
+
+def _wait(retry_state):
+    # Honour Retry-After (CoinGecko rate limits with 429), else exponential backoff
+    error = retry_state.outcome.exception()
+    return min(max(getattr(error, "retry_after", 0.0), _backoff(retry_state)), MAX_WAIT)
+
+def _log_retry(retry_state):
+    symbol = retry_state.args[2]
+    error = retry_state.outcome.exception()
+    print(f"❌ {symbol} error (attempt {retry_state.attempt_number}): {error}")
+
+def _give_up(retry_state):
+    _log_retry(retry_state)
+    print(f"🚫 {retry_state.args[2]} skipped after {retry_state.attempt_number} attempts")
+    return None
+
+@retry(
+    stop=stop_after_attempt(RETRIES),
+    wait=_wait,
+    before_sleep=_log_retry,
+    retry_error_callback=_give_up,
+)
+async def fetch_crypto(session, coin_id, symbol, days=30):
     url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
     params = {"vs_currency": "usd", "days": days, "interval": "daily"}
 
-    for attempt in range(1, retries + 1):
-        try:
-            r = requests.get(url, params=params, timeout=20)
+    async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=20)) as r:
+        if r.status != 200:
+            retry_after = r.headers.get("Retry-After", "")
+            raise HTTPStatusError(r.status, float(retry_after) if retry_after.isdigit() else 0.0)
+        payload = await r.json()
 
-            if r.status_code != 200:
-                print(f"❌ {symbol} failed (status {r.status_code})")
-                time.sleep(2)
-                continue
+    prices = payload.get("prices", [])
+    if not prices:
+        raise ValueError("empty data")
 
-            prices = r.json().get("prices", [])
-            if not prices:
-                print(f"⚠ {symbol} empty data (attempt {attempt})")
-                time.sleep(2)
-                continue
+    df = pd.DataFrame(prices, columns=["timestamp", "price"])
+    df["date"] = pd.to_datetime(df["timestamp"], unit="ms")
+    df["symbol"] = symbol
+    return df[["date", "symbol", "price"]]
 
-            df = pd.DataFrame(prices, columns=["timestamp", "price"])
-            df["date"] = pd.to_datetime(df["timestamp"], unit="ms")
-            df["symbol"] = symbol
-            return df[["date", "symbol", "price"]]
 
-        except Exception as e:
-            print(f"❌ {symbol} error (attempt {attempt}): {e}")
-            time.sleep(2)
-
-    print(f"🚫 {symbol} skipped after {retries} attempts")
-    return None
+async def _run():
+    # One pooled keep-alive session: the TLS handshake is paid once, not per coin
+    connector = aiohttp.TCPConnector(limit=POOL_SIZE, limit_per_host=POOL_SIZE)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(*[
+            fetch_crypto(session, coin_id, symbol)
+            for symbol, coin_id in CRYPTO_MAP.items()
+        ])
 
 
 def main():
-    for symbol, coin_id in CRYPTO_MAP.items():
-        print(f"🪙 Fetching {symbol}")
-        df = fetch_crypto(coin_id, symbol)
+    print(f"🪙 Fetching {', '.join(CRYPTO_MAP)}")
+    results = asyncio.run(_run())
 
+    for symbol, df in zip(CRYPTO_MAP, results):
         if df is not None:
             out = os.path.join(RAW_PATH, f"{symbol}.csv")
-            df.to_csv(out, index=False)
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), out)
             print(f"✅ Saved {symbol}")
         else:
             print(f"⚠ No data saved for {symbol}")
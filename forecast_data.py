@@ -1,16 +1,28 @@
 
 import os
 import glob
+import json
+import pickle
+import hashlib
+import numpy as np
 import pandas as pd
+import pyarrow.dataset as ds
 from statsmodels.tsa.arima.model import ARIMA
 
+from processed_data import mark_last_run
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROCESSED_DIR = os.path.join(ROOT, "data", "processed")
 FORECAST_DIR = os.path.join(ROOT, "data", "forecasted")
+MODEL_DIR = os.path.join(ROOT, "data", "models")
+HASHES_PATH = os.path.join(FORECAST_DIR, ".hashes.json")
 os.makedirs(FORECAST_DIR, exist_ok=True)
+os.makedirs(MODEL_DIR, exist_ok=True)
 
 FORECAST_STEPS = 30
 ARIMA_ORDER = (1, 1, 1)
+# Appends (no parameter re-estimation) allowed before a full refit
+MAX_APPENDS = 7
 
 def prepare_series(df):
     if not {"date", "price"}.issubset(df.columns):
@@ -31,14 +43,79 @@ def prepare_series(df):
 
     return s["price"]
 
-def forecast_one_symbol(symbol, df_symbol):
+def series_hash(y):
+    # Model settings are part of the key: changing them must invalidate old forecasts
+    h = hashlib.blake2b(digest_size=8)
+    h.update(repr((ARIMA_ORDER, FORECAST_STEPS)).encode())
+    h.update(y.values.tobytes())
+    h.update(y.index.values.tobytes())
+    return h.hexdigest()
+
+def load_hashes():
+    try:
+        with open(HASHES_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_hashes(hashes):
+    with open(HASHES_PATH, "w") as f:
+        json.dump(hashes, f, indent=2)
+
+def save_model(path, fit, appends):
+    with open(path, "wb") as f:
+        pickle.dump({"fit": fit, "appends": appends}, f)
+
+def fit_arima(symbol, y):
+    path = os.path.join(MODEL_DIR, f"{symbol}.pkl")
+
+    # Reuse the cached fit when y only extends its sample: append the new
+    # observations (Kalman filter update, no re-estimation), with a full
+    # refit every MAX_APPENDS appends.
+    # NOTE: collect_data fetches a rolling 30-day window and the latest
+    # CoinGecko point moves during the day, so with the current pipeline the
+    # prefix check rarely holds and this falls through to a full fit.
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                cached = pickle.load(f)
+            fit, appends = cached["fit"], cached["appends"]
+            old = fit.model.data.orig_endog
+            n = len(old)
+            if (
+                tuple(fit.model.order) == ARIMA_ORDER
+                and len(y) >= n
+                and y.index[:n].equals(old.index)
+                and np.array_equal(y.values[:n], np.asarray(old).ravel())
+            ):
+                if len(y) == n:
+                    return fit
+                if appends < MAX_APPENDS:
+                    fit = fit.append(y.iloc[n:], refit=False)
+                    save_model(path, fit, appends + 1)
+                    return fit
+        except Exception as e:
+            print(f"⚠ Cached model for {symbol} unusable, refitting: {e}")
+
+    fit = ARIMA(y, order=ARIMA_ORDER).fit()
+    save_model(path, fit, 0)
+    return fit
+
+def forecast_one_symbol(symbol, df_symbol, hashes=None):
     y = prepare_series(df_symbol)
     if y is None:
         return None
 
+    out_path = os.path.join(FORECAST_DIR, f"forecast_{symbol}.parquet")
+
+    # Same input series as the last run -> the existing forecast is still valid
+    h = series_hash(y)
+    if hashes is not None and hashes.get(symbol) == h and os.path.exists(out_path):
+        print(f"ℹ {symbol} unchanged, reusing forecast")
+        return pd.read_parquet(out_path, engine="pyarrow")
+
     try:
-        model = ARIMA(y, order=ARIMA_ORDER)
-        fit = model.fit()
+        fit = fit_arima(symbol, y)
         fc = fit.get_forecast(steps=FORECAST_STEPS)
         fc_mean = fc.predicted_mean
         fc_ci = fc.conf_int()
@@ -51,7 +128,9 @@ def forecast_one_symbol(symbol, df_symbol):
             "ci_upper": fc_ci.iloc[:, 1].values
         })
 
-        out.to_csv(os.path.join(FORECAST_DIR, f"forecast_{symbol}.csv"), index=False)
+        out.to_parquet(out_path, engine="pyarrow", compression="zstd", index=False)
+        if hashes is not None:
+            hashes[symbol] = h
         return out
 
     except Exception as e:
@@ -59,14 +138,24 @@ def forecast_one_symbol(symbol, df_symbol):
         return None
 
 def main():
-    files = glob.glob(os.path.join(PROCESSED_DIR, "*.csv"))
+    files = glob.glob(os.path.join(PROCESSED_DIR, "*.parquet"))
     if not files:
         return
 
-    data = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+    data = ds.dataset(files, format="parquet").to_table(columns=["date", "symbol", "price"]).to_pandas()
 
+    hashes = load_hashes()
+    saved = 0
     for symbol, df_symbol in data.groupby("symbol"):
-        forecast_one_symbol(symbol, df_symbol)
+        saved += forecast_one_symbol(symbol, df_symbol, hashes) is not None
+    save_hashes(hashes)
+
+    # Every forecast failed -> leave the data stale so the next start retries
+    if not saved:
+        print("⚠ No forecasts saved")
+        return
+
+    mark_last_run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
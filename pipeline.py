@@ -0,0 +1,50 @@
+import os
+import fcntl
+from contextlib import contextmanager
+
+from collect_data import main as collect_main
+from processed_data import main as process_main
+from forecast_data import main as forecast_main
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LOCK_PATH = os.path.join(ROOT_DIR, "data", ".pipeline.lock")
+
+# --------------------------------
+# Cross-process lock (app workers, systemd timer, manual runs)
+# --------------------------------
+@contextmanager
+def pipeline_lock(blocking=False):
+    os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+    with open(LOCK_PATH, "a") as f:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(f, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+# --------------------------------
+# Daily pipeline (run in-process: pandas/statsmodels are imported once)
+# --------------------------------
+def main():
+    with pipeline_lock() as acquired:
+        if not acquired:
+            print("⏭ Pipeline already running in another process, skipping")
+            return False
+
+        print("🔄 Running daily data pipeline...")
+        collect_main()
+        process_main()
+        forecast_main()
+        print("✅ Pipeline finished!")
+        return True
+
+# --------------------------------
+# Entry point
+# --------------------------------
+if __name__ == "__main__":
+    main()